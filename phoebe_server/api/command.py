@@ -13,20 +13,20 @@ router = APIRouter()
 @router.post('/send/{session_id}', dependencies=[Depends(verify_api_key)])
 async def send(session_id: str, command: dict):
     """Send a command to a PHOEBE session."""
-    info = session_manager.get_server_info(session_id)
-    if not info:
+    port = session_manager.get_port(session_id)
+    if port is None:
         raise HTTPException(status_code=404, detail='Invalid session ID')
 
     # Update activity timestamp
     session_manager.update_last_activity(session_id)
 
-    port = info['port']
     command_name = command.get('command', 'unknown')
 
-    # Send command and measure execution time
-    start_time = time.time()
+    # Send command and measure execution time; perf_counter is immune to
+    # wall-clock adjustments
+    start_time = time.perf_counter()
     response = send_command(port, command)
-    execution_time_ms = (time.time() - start_time) * 1000
+    execution_time_ms = (time.perf_counter() - start_time) * 1000
 
     # Log command execution to database
     success = response.get('success', False)
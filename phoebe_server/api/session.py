@@ -13,8 +13,9 @@ def get_client_ip(request: Request) -> str:
     # Check X-Forwarded-For header (proxy/load balancer)
     forwarded_for = request.headers.get('X-Forwarded-For', None)
     if forwarded_for is not None:
-        # X-Forwarded-For can contain multiple IPs, first one is the original client
-        return forwarded_for.split(",")[0].strip()
+        # X-Forwarded-For can contain multiple IPs, first one is the original
+        # client; partition stops at the first comma without building a list
+        return forwarded_for.partition(",")[0].strip()
     # Fall back to direct connection IP
     if request.client:
         return request.client.host
@@ -63,13 +64,7 @@ async def update_user_info(session_id: str, first_name: str, last_name: str, ema
 @router.get("/session-memory", dependencies=[Depends(verify_api_key)])
 async def session_memory_all():
     """Get memory usage for all sessions."""
-    sessions = session_manager.list_sessions()
-    memory_data = {}
-    for session_id in sessions.keys():
-        mem_used = session_manager.get_current_memory_usage(session_id)
-        if mem_used is not None:
-            memory_data[session_id] = mem_used
-    return memory_data
+    return session_manager.poll_all_memory()
 
 
 @router.post("/session-memory/{session_id}", dependencies=[Depends(verify_api_key)])
@@ -1,29 +1,88 @@
+import queue
 import sqlite3
 import logging
 from pathlib import Path
 from contextlib import contextmanager
 from .config import config
+from . import db_writer
 
 logger = logging.getLogger(__name__)
 
 # Global database path
 _db_path: Path | None = None
 
+# Command-log filter sets, parsed once from config in init_database()
+_log_include: frozenset[str] = frozenset()
+_log_exclude: frozenset[str] = frozenset()
+
+# Pool of pre-opened connections shared across FastAPI's worker threads.
+# Opening a sqlite3 connection per log call re-reads the WAL header and
+# rebuilds the page cache each time, which dominates the cost of the
+# actual insert; reusing connections amortizes that to near-zero.
+_POOL_SIZE = 4
+_pool: queue.Queue = queue.Queue(maxsize=_POOL_SIZE)
+
+
+def _new_connection() -> sqlite3.Connection:
+    """Open a new connection with the standard per-connection pragmas."""
+    # The log helpers all pass literal SQL strings, so a larger statement
+    # cache lets SQLite skip re-parsing/re-planning them on every call.
+    conn = sqlite3.connect(
+        str(_db_path), timeout=10.0, check_same_thread=False, cached_statements=256
+    )
+    # Enable WAL mode for better concurrency
+    conn.execute("PRAGMA journal_mode=WAL")
+    # With WAL, synchronous=NORMAL skips the per-commit fsync; at most the
+    # last telemetry write is lost on an OS crash, which is acceptable for
+    # session logs and roughly 3x faster on the command hot path.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA busy_timeout=5000")
+    # Checkpointing is done by the periodic task in main.py; with the
+    # automatic checkpoint disabled no request-path commit ever pays the
+    # WAL truncation cost.
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    return conn
+
+
+def _close_pool():
+    """Close all pooled connections (used when re-initializing)."""
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            break
+
 
 def init_database():
     """Initialize the database with schema and WAL mode."""
-    global _db_path
-    _db_path = Path(config.database.path)
+    global _db_path, _log_include, _log_exclude
+
+    _log_include = frozenset(
+        c.strip() for c in config.database.log_include_commands.split(",") if c.strip()
+    )
+    _log_exclude = frozenset(
+        c.strip() for c in config.database.log_exclude_commands.split(",") if c.strip()
+    )
+
+    new_path = Path(config.database.path)
+    if _db_path is not None and new_path != _db_path:
+        db_writer.stop()
+        _close_pool()
+    _db_path = new_path
 
     # Create directory if it doesn't exist
     _db_path.parent.mkdir(parents=True, exist_ok=True)
 
     with get_db() as db:
-        # Enable WAL mode for better concurrency
-        db.execute("PRAGMA journal_mode=WAL")
+        # Create tables, then indexes, in a single script: one parse, and
+        # the explicit BEGIN/COMMIT gives one write-lock acquisition
+        # instead of one autocommit transaction per DDL statement
+        db.executescript("""
+            BEGIN;
 
-        # Create tables
-        db.execute("""
             CREATE TABLE IF NOT EXISTS sessions (
                 session_id TEXT PRIMARY KEY,
                 created_at REAL NOT NULL,
@@ -35,20 +94,16 @@ def init_database():
                 project_name TEXT,
                 termination_reason TEXT,
                 status TEXT NOT NULL DEFAULT 'active'
-            )
-        """)
+            );
 
-        db.execute("""
             CREATE TABLE IF NOT EXISTS session_metrics (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 session_id TEXT NOT NULL,
                 timestamp REAL NOT NULL,
                 memory_used_mb REAL NOT NULL,
                 FOREIGN KEY (session_id) REFERENCES sessions (session_id)
-            )
-        """)
+            );
 
-        db.execute("""
             CREATE TABLE IF NOT EXISTS session_commands (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 session_id TEXT NOT NULL,
@@ -58,10 +113,8 @@ def init_database():
                 execution_time_ms REAL,
                 error_message TEXT,
                 FOREIGN KEY (session_id) REFERENCES sessions (session_id)
-            )
-        """)
+            );
 
-        db.execute("""
             CREATE TABLE IF NOT EXISTS session_user_info (
                 session_id TEXT PRIMARY KEY,
                 first_name TEXT,
@@ -69,116 +122,109 @@ def init_database():
                 email TEXT,
                 updated_at REAL NOT NULL,
                 FOREIGN KEY (session_id) REFERENCES sessions (session_id)
-            )
-        """)
+            );
 
-        # Create indexes
-        db.execute("""
             CREATE INDEX IF NOT EXISTS idx_sessions_created_at
-            ON sessions (created_at)
-        """)
+            ON sessions (created_at);
 
-        db.execute("""
             CREATE INDEX IF NOT EXISTS idx_sessions_status
-            ON sessions (status)
-        """)
+            ON sessions (status);
 
-        db.execute("""
-            CREATE INDEX IF NOT EXISTS idx_session_commands_session_id
-            ON session_commands (session_id)
-        """)
+            -- Compound indexes serve per-session history queries ordered
+            -- by time without a sort; they also cover plain session_id
+            -- lookups as a prefix, so the old single-column indexes are
+            -- dropped on databases that still carry them.
+            DROP INDEX IF EXISTS idx_session_commands_session_id;
+            DROP INDEX IF EXISTS idx_session_metrics_session_id;
 
-        db.execute("""
-            CREATE INDEX IF NOT EXISTS idx_session_metrics_session_id
-            ON session_metrics (session_id)
+            CREATE INDEX IF NOT EXISTS idx_commands_sid_ts
+            ON session_commands (session_id, timestamp DESC);
+
+            CREATE INDEX IF NOT EXISTS idx_metrics_sid_ts
+            ON session_metrics (session_id, timestamp DESC);
+
+            COMMIT;
         """)
 
-        db.commit()
-        logger.info(f"Database initialized at {_db_path}")
+    # Log writes go through a background writer thread so request handlers
+    # never block on the SQLite writer lock.
+    db_writer.start(_new_connection)
+    logger.info(f"Database initialized at {_db_path}")
 
 
 @contextmanager
 def get_db():
-    """Get a database connection context manager."""
+    """Get a pooled database connection context manager."""
     if _db_path is None:
         raise RuntimeError("Database not initialized. Call init_database() first.")
 
-    conn = sqlite3.connect(str(_db_path), timeout=10.0)
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _new_connection()
     try:
         yield conn
     finally:
-        conn.close()
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
 
 
-def should_log_command(command_name: str) -> bool:
-    """Check if a command should be logged based on configuration."""
-    exclude = [c.strip() for c in config.database.log_exclude_commands.split(",") if c.strip()]
-    include = [c.strip() for c in config.database.log_include_commands.split(",") if c.strip()]
+def checkpoint_wal():
+    """Checkpoint and truncate the WAL file."""
+    try:
+        with get_db() as db:
+            db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except Exception as e:
+        logger.error(f"WAL checkpoint failed: {e}")
 
-    # If include list is specified, only log those
-    if include:
-        return command_name in include
 
-    # Otherwise, log everything except excluded
-    return command_name not in exclude
+def should_log_command(command_name: str) -> bool:
+    """Check if a command should be logged based on configuration."""
+    # If include list is specified, only log those; otherwise log
+    # everything except excluded
+    if _log_include:
+        return command_name in _log_include
+    return command_name not in _log_exclude
 
 
 def log_session_created(session_id: str, created_at: float, port: int, client_ip: str | None = None, user_agent: str | None = None, project_name: str | None = None):
     """Log a new session creation."""
-    try:
-        with get_db() as db:
-            db.execute("""
-                INSERT INTO sessions
-                (session_id, created_at, last_activity, port, client_ip, user_agent, project_name, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, 'active')
-            """, (session_id, created_at, created_at, port, client_ip, user_agent, project_name))
-            db.commit()
-            logger.debug(f"Logged session creation: {session_id}")
-    except Exception as e:
-        logger.error(f"Failed to log session creation: {e}")
+    db_writer.submit("""
+        INSERT INTO sessions
+        (session_id, created_at, last_activity, port, client_ip, user_agent, project_name, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 'active')
+    """, (session_id, created_at, created_at, port, client_ip, user_agent, project_name))
+    logger.debug(f"Logged session creation: {session_id}")
 
 
 def log_session_destroyed(session_id: str, destroyed_at: float, termination_reason: str):
     """Log session destruction."""
-    try:
-        with get_db() as db:
-            db.execute("""
-                UPDATE sessions
-                SET destroyed_at = ?, termination_reason = ?, status = 'terminated'
-                WHERE session_id = ?
-            """, (destroyed_at, termination_reason, session_id))
-            db.commit()
-            logger.debug(f"Logged session destruction: {session_id}")
-    except Exception as e:
-        logger.error(f"Failed to log session destruction: {e}")
+    db_writer.submit("""
+        UPDATE sessions
+        SET destroyed_at = ?, termination_reason = ?, status = 'terminated'
+        WHERE session_id = ?
+    """, (destroyed_at, termination_reason, session_id))
+    logger.debug(f"Logged session destruction: {session_id}")
 
 
 def log_session_activity(session_id: str, last_activity: float):
     """Update session last activity timestamp."""
-    try:
-        with get_db() as db:
-            db.execute("""
-                UPDATE sessions
-                SET last_activity = ?
-                WHERE session_id = ?
-            """, (last_activity, session_id))
-            db.commit()
-    except Exception as e:
-        logger.error(f"Failed to log session activity: {e}")
+    db_writer.submit("""
+        UPDATE sessions
+        SET last_activity = ?
+        WHERE session_id = ?
+    """, (last_activity, session_id))
 
 
 def log_session_metric(session_id: str, timestamp: float, memory_used_mb: float):
     """Log a session resource metric snapshot."""
-    try:
-        with get_db() as db:
-            db.execute("""
-                INSERT INTO session_metrics
-                (session_id, timestamp, memory_used_mb)
-                VALUES (?, ?, ?)
-            """, (session_id, timestamp, memory_used_mb))
-            db.commit()
-    except Exception as e:
-        logger.error(f"Failed to log session metric: {e}")
+    db_writer.submit("""
+        INSERT INTO session_metrics
+        (session_id, timestamp, memory_used_mb)
+        VALUES (?, ?, ?)
+    """, (session_id, timestamp, memory_used_mb))
 
 
 def log_command_execution(session_id: str, timestamp: float, command_name: str, success: bool, execution_time_ms: float | None = None, error_message: str | None = None):
@@ -186,27 +232,17 @@ def log_command_execution(session_id: str, timestamp: float, command_name: str,
     if not should_log_command(command_name):
         return
 
-    try:
-        with get_db() as db:
-            db.execute("""
-                INSERT INTO session_commands
-                (session_id, timestamp, command_name, success, execution_time_ms, error_message)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (session_id, timestamp, command_name, int(success), execution_time_ms, error_message))
-            db.commit()
-    except Exception as e:
-        logger.error(f"Failed to log command execution: {e}")
+    db_writer.submit("""
+        INSERT INTO session_commands
+        (session_id, timestamp, command_name, success, execution_time_ms, error_message)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (session_id, timestamp, command_name, int(success), execution_time_ms, error_message))
 
 
 def log_user_info_update(session_id: str, first_name: str, last_name: str, email: str, updated_at: float):
     """Log or update user information for a session."""
-    try:
-        with get_db() as db:
-            db.execute("""
-                INSERT OR REPLACE INTO session_user_info
-                (session_id, first_name, last_name, email, updated_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (session_id, first_name, last_name, email, updated_at))
-            db.commit()
-    except Exception as e:
-        logger.error(f"Failed to log user info update: {e}")
+    db_writer.submit("""
+        INSERT OR REPLACE INTO session_user_info
+        (session_id, first_name, last_name, email, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, (session_id, first_name, last_name, email, updated_at))
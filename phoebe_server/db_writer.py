@@ -0,0 +1,114 @@
+"""Background database writer thread.
+
+Log writes used to run synchronously inside the request handlers, which
+serialized every request through SQLite's single writer lock. Handlers now
+enqueue (sql, params) records and return immediately; a daemon thread owning
+its own connection drains the queue and commits records in batches.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Drain up to _BATCH_SIZE records or whatever arrives within _BATCH_WINDOW_S
+# of the first one, then commit them in a single transaction.
+_BATCH_SIZE = 50
+_BATCH_WINDOW_S = 0.2
+
+_SENTINEL = object()
+
+_queue: queue.Queue = queue.Queue()
+_thread: threading.Thread | None = None
+_connect = None
+
+
+def start(connect):
+    """Start the writer thread, opening its connection via `connect`."""
+    global _thread, _connect
+    if _thread is not None and _thread.is_alive():
+        return
+    _connect = connect
+    _thread = threading.Thread(target=_run, name="db-writer", daemon=True)
+    _thread.start()
+
+
+def submit(sql: str, params: tuple):
+    """Queue a write for the background thread."""
+    _queue.put_nowait((sql, params))
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """Block until all records submitted so far have been committed."""
+    if _thread is None or not _thread.is_alive():
+        return True
+    fence = threading.Event()
+    _queue.put_nowait(fence)
+    return fence.wait(timeout)
+
+
+def stop(timeout: float = 5.0):
+    """Drain the queue and stop the writer thread."""
+    global _thread
+    if _thread is None:
+        return
+    _queue.put_nowait(_SENTINEL)
+    _thread.join(timeout)
+    _thread = None
+
+
+def _run():
+    # The writer owns its connection; autocommit mode so the explicit
+    # BEGIN/COMMIT below controls transaction boundaries.
+    conn = _connect()
+    conn.isolation_level = None
+
+    try:
+        stop_requested = False
+        while not stop_requested:
+            batch = [_queue.get()]
+            deadline = time.monotonic() + _BATCH_WINDOW_S
+            while len(batch) < _BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            records = [item for item in batch if isinstance(item, tuple)]
+            if records:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    # Runs of the same statement (e.g. one metric insert per
+                    # session from a memory poll) go through executemany;
+                    # grouping only consecutive records preserves ordering.
+                    i = 0
+                    while i < len(records):
+                        sql = records[i][0]
+                        j = i + 1
+                        while j < len(records) and records[j][0] == sql:
+                            j += 1
+                        if j - i > 1:
+                            conn.executemany(sql, [params for _, params in records[i:j]])
+                        else:
+                            conn.execute(sql, records[i][1])
+                        i = j
+                    conn.execute("COMMIT")
+                except Exception as e:
+                    logger.error(f"Database writer batch failed: {e}")
+                    try:
+                        conn.execute("ROLLBACK")
+                    except Exception:
+                        pass
+
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is _SENTINEL:
+                    stop_requested = True
+    finally:
+        conn.close()
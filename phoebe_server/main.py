@@ -9,6 +9,7 @@ from .api import session, command, health
 from .manager.session_manager import load_port_config, cleanup_idle_sessions, shutdown_all_sessions
 from .config import config
 from . import database
+from . import db_writer
 
 # Configure logging
 logging.basicConfig(
@@ -26,23 +27,30 @@ async def lifespan(app: FastAPI):
     load_port_config()
     logger.info("PHOEBE Server starting up")
 
-    # Start background task for idle session cleanup
+    # Start background tasks for idle session cleanup and WAL checkpointing
     cleanup_task = asyncio.create_task(periodic_cleanup())
+    checkpoint_task = asyncio.create_task(periodic_checkpoint())
 
     yield
 
     # Shutdown
     logger.info("PHOEBE Server shutting down - closing all sessions")
     cleanup_task.cancel()
-    try:
-        await cleanup_task
-    except asyncio.CancelledError:
-        pass
+    checkpoint_task.cancel()
+    for task in (cleanup_task, checkpoint_task):
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
     # Shutdown all active sessions to free ports
     count = shutdown_all_sessions()
     if count > 0:
         logger.info(f"Shut down {count} active sessions")
+
+    # Flush any queued log writes and truncate the WAL before exiting
+    db_writer.stop()
+    database.checkpoint_wal()
     logger.info("PHOEBE Server shutdown complete")
 
 
@@ -60,6 +68,18 @@ async def periodic_cleanup():
             logger.error(f"Error in periodic cleanup: {e}")
 
 
+async def periodic_checkpoint():
+    """Periodically checkpoint the WAL so no request-path commit pays for it."""
+    while True:
+        try:
+            await asyncio.sleep(30)
+            await asyncio.to_thread(database.checkpoint_wal)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Error in periodic checkpoint: {e}")
+
+
 app = FastAPI(
     title="PHOEBE Server",
     description="Backend server for PHOEBE computation and session management",
@@ -6,8 +6,10 @@ from .session_manager import (
     shutdown_server,
     list_sessions,
     get_server_info,
+    get_port,
     update_session_user_info,
     get_current_memory_usage,
+    poll_all_memory,
     get_port_status,
 )
 
@@ -17,7 +19,9 @@ __all__ = [
     'shutdown_server',
     'list_sessions',
     'get_server_info',
+    'get_port',
     'update_session_user_info',
     'get_current_memory_usage',
+    'poll_all_memory',
     'get_port_status',
 ]
@@ -5,24 +5,80 @@ import uuid
 import time
 import psutil
 import logging
+import threading
+import subprocess
 import zmq
+import heapq
+from collections import deque
+from pathlib import Path
 from ..config import config
+from ..worker import wire
+from ..worker.proxy import worker_endpoint
 from .. import database
 
 logger = logging.getLogger(__name__)
 
 server_registry: dict[str, dict] = {}
-available_ports: list[int] = []
+available_ports: deque[int] = deque()
 reserved_ports: set = set()
 
+# Guards the port pool: sync endpoints run on FastAPI's threadpool, so
+# two concurrent start-session requests could otherwise pop the same
+# port. The critical section is just the pop/add pair.
+_port_lock = threading.Lock()
+
+# Config values used on hot paths, bound once at load_port_config so per
+# request code does a plain global load instead of walking the pydantic
+# attribute chain.
+_idle_timeout: float = config.session.idle_timeout_seconds
+_port_min: int = config.port_pool.start
+_port_max: int = config.port_pool.end - 1
+
+# Minimum spacing between last_activity DB writes for a session; a burst
+# of commands updates the in-memory timestamp every time but produces at
+# most one UPDATE per interval.
+_ACTIVITY_LOG_INTERVAL_S = 5.0
+
+# Serve RSS from the last reading when polled again within this window,
+# so a dashboard poll and a command-triggered poll in the same second
+# cost one memory_info() syscall, not two.
+_RSS_TTL_S = 1.0
+
+# Worker RSS changes slowly; skip metric rows that would repeat the last
+# value within this delta, but still write one periodically so gaps in
+# the series stay bounded.
+_METRIC_MIN_DELTA_MB = 1.0
+_METRIC_MAX_INTERVAL_S = 60.0
+
+# Minimum spacing between proc.is_running() probes per session; dashboard
+# polling of /sessions otherwise costs one syscall per session per poll.
+_LIVENESS_TTL_S = 1.0
+
+# Min-heap of (last_activity_mono, session_id) used by
+# cleanup_idle_sessions. Idle tracking runs on time.monotonic() so an
+# NTP step can't spuriously expire (or immortalize) sessions; wall-clock
+# timestamps are kept only for the public view and the database.
+# Activity updates push new entries without removing old ones; stale
+# entries are discarded lazily when popped.
+_idle_heap: list[tuple[float, str]] = []
+
+# Shared ZMQ context; terminating a context joins its IO threads, so we
+# never tear it down per call.
+_zmq_context = zmq.Context.instance()
+
 
 def cleanup_orphaned_workers():
     """Clean up any orphaned worker processes from previous server runs."""
     orphaned_count = 0
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+    for proc in psutil.process_iter(['pid', 'name']):
         try:
-            cmdline = proc.info.get('cmdline', [])
-            if cmdline and 'phoebe_server.worker.phoebe_worker' in ' '.join(cmdline):
+            # Workers are python processes; filter on the cheap name
+            # attribute before reading cmdline (an extra syscall per proc)
+            name = proc.info.get('name') or ''
+            if not name.startswith('python'):
+                continue
+            cmdline = proc.cmdline()
+            if any('phoebe_server.worker.phoebe_worker' in arg for arg in cmdline):
                 # This is a worker process - check if it's orphaned (parent not this server)
                 if proc.ppid() != psutil.Process().pid:
                     logger.warning(f"Found orphaned worker process (PID {proc.pid}), terminating")
@@ -43,57 +99,66 @@ def cleanup_orphaned_workers():
 
 def load_port_config():
     """Load port pool configuration."""
-    global available_ports
+    global available_ports, _idle_timeout, _port_min, _port_max
 
     # Clean up any orphaned workers before initializing port pool
     cleanup_orphaned_workers()
 
     start = config.port_pool.start
     end = config.port_pool.end
-    available_ports = list(range(start, end))
+    available_ports = deque(range(start, end))
+    _idle_timeout = config.session.idle_timeout_seconds
+    _port_min = start
+    _port_max = end - 1
     logger.info(f"Port pool configured: {start}-{end} ({len(available_ports)} ports)")
 
 
 def request_port() -> int:
     """Request an available port from the pool."""
-    if not available_ports:
-        raise RuntimeError("No available ports in pool")
-    port = available_ports.pop(0)
-    reserved_ports.add(port)
-    return port
+    with _port_lock:
+        if not available_ports:
+            raise RuntimeError("No available ports in pool")
+        port = available_ports.popleft()
+        reserved_ports.add(port)
+        return port
 
 
 def release_port(port: int):
     """Release a port back to the pool."""
-    if port in reserved_ports:
-        reserved_ports.remove(port)
-        available_ports.append(port)
+    with _port_lock:
+        if port in reserved_ports:
+            reserved_ports.remove(port)
+            available_ports.append(port)
 
 
 def _wait_for_worker_ready(port: int, timeout: float = 30.0) -> bool:
     """Wait for worker to be ready by sending a ping command."""
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            context = zmq.Context()
-            socket = context.socket(zmq.REQ)
-            socket.setsockopt(zmq.RCVTIMEO, 2000)  # 2 second receive timeout
-            socket.setsockopt(zmq.SNDTIMEO, 2000)  # 2 second send timeout
-            socket.connect(f"tcp://127.0.0.1:{port}")
-
-            socket.send_json({"command": "ping"})
-            response = socket.recv_json()
-            socket.close()
-            context.term()
-
-            if isinstance(response, dict) and response.get("success"):
-                return True
-        except zmq.Again:
-            time.sleep(0.5)
-        except Exception as e:
-            logger.debug(f"Worker readiness check attempt failed: {e}")
-            time.sleep(0.5)
-    return False
+    socket = _zmq_context.socket(zmq.REQ)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.setsockopt(zmq.RCVTIMEO, 2000)  # 2 second receive timeout
+    socket.setsockopt(zmq.SNDTIMEO, 2000)  # 2 second send timeout
+    # Allow re-sending a ping on the same socket after a receive timeout
+    # instead of tearing the REQ state machine down each retry
+    socket.setsockopt(zmq.REQ_RELAXED, 1)
+    socket.setsockopt(zmq.REQ_CORRELATE, 1)
+    socket.connect(worker_endpoint(port))
+
+    try:
+        start_time = time.monotonic()
+        while time.monotonic() - start_time < timeout:
+            try:
+                socket.send(wire.pack(["ping", {}]))
+                response = wire.unpack(socket.recv())
+                if isinstance(response, dict) and response.get("success"):
+                    return True
+            except zmq.Again:
+                time.sleep(0.5)
+            except Exception as e:
+                logger.debug(f"Worker readiness check attempt failed: {e}")
+                time.sleep(0.5)
+        return False
+    finally:
+        socket.close()
 
 
 def launch_phoebe_worker(client_ip: str | None = None, user_agent: str | None = None, metadata: dict | None = None) -> dict:
@@ -108,7 +173,9 @@ def launch_phoebe_worker(client_ip: str | None = None, user_agent: str | None =
     email = metadata.get('email', None) if metadata else None
 
     try:
-        proc = psutil.Popen([
+        # Plain subprocess.Popen skips psutil's wrapper setup; a psutil
+        # handle is kept alongside only for memory_info() reads.
+        proc = subprocess.Popen([
             sys.executable, "-m", "phoebe_server.worker.phoebe_worker", str(port)
         ])
 
@@ -117,24 +184,32 @@ def launch_phoebe_worker(client_ip: str | None = None, user_agent: str | None =
             proc.terminate()
             try:
                 proc.wait(timeout=3)
-            except psutil.TimeoutExpired:
+            except subprocess.TimeoutExpired:
                 proc.kill()
             release_port(port)
             raise RuntimeError(f"Worker failed to start within timeout on port {port}")
 
         server_registry[session_id] = {
-            'session_id': session_id,
             'process': proc,
-            'created_at': timestamp,
-            'last_activity': timestamp,
-            'mem_used': 0.0,
-            'port': port,
-            'project_name': project_name,
-            'first_name': first_name,
-            'last_name': last_name,
-            'email': email,
+            '_ps': psutil.Process(proc.pid),
+            '_last_activity_mono': time.monotonic(),
+            # Pre-filtered view handed to API callers; mutators update it
+            # in place so get_server_info never rebuilds a dict.
+            'public': {
+                'session_id': session_id,
+                'created_at': timestamp,
+                'last_activity': timestamp,
+                'mem_used': 0.0,
+                'port': port,
+                'project_name': project_name,
+                'first_name': first_name,
+                'last_name': last_name,
+                'email': email,
+            },
         }
 
+        heapq.heappush(_idle_heap, (server_registry[session_id]['_last_activity_mono'], session_id))
+
         # Log to database
         database.log_session_created(
             session_id=session_id,
@@ -146,7 +221,7 @@ def launch_phoebe_worker(client_ip: str | None = None, user_agent: str | None =
         )
 
         logger.info(f"Started session {session_id} on port {port}")
-        return {k: v for k, v in server_registry[session_id].items() if k != 'process'}
+        return server_registry[session_id]['public']
 
     except Exception as e:
         release_port(port)
@@ -159,26 +234,73 @@ def update_last_activity(session_id: str):
     info = server_registry.get(session_id)
     if info:
         current_time = time.time()
-        info['last_activity'] = current_time
-        database.log_session_activity(session_id, current_time)
+        mono_time = time.monotonic()
+        info['public']['last_activity'] = current_time
+        info['_last_activity_mono'] = mono_time
+        heapq.heappush(_idle_heap, (mono_time, session_id))
+        if mono_time - info.get('_last_logged_activity', 0.0) > _ACTIVITY_LOG_INTERVAL_S:
+            info['_last_logged_activity'] = mono_time
+            database.log_session_activity(session_id, current_time)
 
 
 def get_current_memory_usage(session_id: str) -> float | None:
     """Get current memory usage of a worker process."""
     info = server_registry.get(session_id)
-    if info and info.get('process'):
-        proc = info['process']
-        try:
-            mem_used = proc.memory_info().rss / (1024 * 1024)  # MiB
-            server_registry[session_id]['mem_used'] = mem_used
-            current_time = time.time()
-            update_last_activity(session_id)
-            # Log metric to database
-            database.log_session_metric(session_id, current_time, mem_used)
-            return mem_used
-        except psutil.NoSuchProcess:
-            return None
-    return None
+    if not info:
+        return None
+    mono_time = time.monotonic()
+    mem_used = _read_rss(info, mono_time)
+    if mem_used is None:
+        return None
+    # Log metric to database; activity is updated by the command handler,
+    # not by memory polling
+    _log_metric_if_changed(session_id, info, mem_used, time.time(), mono_time)
+    return mem_used
+
+
+def _read_rss(info: dict, mono_time: float) -> float | None:
+    """Read worker RSS in MiB, reusing a recent reading within _RSS_TTL_S."""
+    if mono_time - info.get('_rss_checked_at', 0.0) < _RSS_TTL_S:
+        return info['public']['mem_used']
+    ps = info.get('_ps')
+    if ps is None:
+        return None
+    try:
+        rss = ps.memory_info().rss / (1024 * 1024)  # MiB
+    except psutil.NoSuchProcess:
+        return None
+    info['_rss_checked_at'] = mono_time
+    return rss
+
+
+def _log_metric_if_changed(session_id: str, info: dict, mem_used: float, current_time: float, mono_time: float):
+    """Log a metric row unless it would repeat the previous value."""
+    previous = info['public']['mem_used']
+    info['public']['mem_used'] = mem_used
+    if (abs(mem_used - previous) > _METRIC_MIN_DELTA_MB
+            or mono_time - info.get('_last_metric_ts', 0.0) > _METRIC_MAX_INTERVAL_S):
+        info['_last_metric_ts'] = mono_time
+        database.log_session_metric(session_id, current_time, mem_used)
+
+
+def poll_all_memory() -> dict:
+    """Poll memory usage of all workers, logging metrics in one batch."""
+    memory_data = {}
+    current_time = time.time()
+    mono_time = time.monotonic()
+
+    for session_id, info in list(server_registry.items()):
+        mem_used = _read_rss(info, mono_time)
+        if mem_used is None:
+            continue
+        memory_data[session_id] = mem_used
+
+    # Consecutive submissions of the same insert are batched by the db
+    # writer into a single executemany transaction.
+    for session_id, mem_used in memory_data.items():
+        _log_metric_if_changed(session_id, server_registry[session_id], mem_used, current_time, mono_time)
+
+    return memory_data
 
 
 def get_server_info(session_id: str) -> dict | None:
@@ -186,17 +308,26 @@ def get_server_info(session_id: str) -> dict | None:
     info = server_registry.get(session_id)
     if not info:
         return None
-    return {k: v for k, v in info.items() if k != 'process'}
+    return info['public']
+
+
+def get_port(session_id: str) -> int | None:
+    """Get the worker port for a session without building an info dict."""
+    info = server_registry.get(session_id)
+    if not info:
+        return None
+    return info['public']['port']
 
 
 def update_session_user_info(session_id: str, first_name: str, last_name: str, email: str) -> bool:
     """Update user information for a session."""
     info = server_registry.get(session_id)
     if info:
-        info['user_first_name'] = first_name
-        info['user_last_name'] = last_name
-        info['user_email'] = email
-        info['user_display_name'] = f"{first_name} {last_name}"
+        public = info['public']
+        public['user_first_name'] = first_name
+        public['user_last_name'] = last_name
+        public['user_email'] = email
+        public['user_display_name'] = f"{first_name} {last_name}"
         current_time = time.time()
         update_last_activity(session_id)
         # Log to database
@@ -212,25 +343,28 @@ def shutdown_server(session_id: str, termination_reason: str = "manual") -> bool
         return False
 
     proc = info.get("process")
-    port = info.get("port")
+    port = info['public']['port']
 
     # Terminate process with timeout
     if proc:
         try:
-            if proc.is_running():
+            if proc.poll() is None:
                 proc.terminate()
                 try:
                     proc.wait(timeout=3)
-                except psutil.TimeoutExpired:
+                except subprocess.TimeoutExpired:
                     logger.warning(f"Session {session_id} did not terminate gracefully, killing")
                     proc.kill()
                     proc.wait()
-        except psutil.NoSuchProcess:
+        except ProcessLookupError:
             pass
 
-    # Always free the port
+    # Always free the port and remove the worker's ipc socket file
     if port:
         release_port(port)
+        endpoint = worker_endpoint(port)
+        if endpoint.startswith("ipc://"):
+            Path(endpoint[len("ipc://"):]).unlink(missing_ok=True)
 
     # Log to database
     database.log_session_destroyed(
@@ -247,11 +381,18 @@ def shutdown_server(session_id: str, termination_reason: str = "manual") -> bool
 
 def list_sessions() -> dict:
     """List all active sessions."""
-    # Clean up dead processes first
+    # Clean up dead processes first; liveness probes are rate-limited per
+    # session since each poll() is a waitpid syscall
     dead_sessions = []
+    current_time = time.monotonic()
     for session_id, info in server_registry.items():
         proc = info.get("process")
-        if proc and not proc.is_running():
+        if not proc:
+            continue
+        if current_time - info.get('_liveness_checked_at', 0.0) < _LIVENESS_TTL_S:
+            continue
+        info['_liveness_checked_at'] = current_time
+        if proc.poll() is not None:
             dead_sessions.append(session_id)
 
     for session_id in dead_sessions:
@@ -265,21 +406,30 @@ def list_sessions() -> dict:
 
 def cleanup_idle_sessions():
     """Clean up sessions that have been idle for longer than the configured timeout."""
-    idle_timeout = config.session.idle_timeout_seconds
-    current_time = time.time()
-    idle_sessions = []
+    idle_timeout = _idle_timeout
+    current_time = time.monotonic()
+    cleaned = 0
+
+    # Peek at the oldest heap entry and stop as soon as the deadline is
+    # not exceeded, so cleanup cost is independent of total session count.
+    while _idle_heap:
+        last_activity, session_id = _idle_heap[0]
+        if current_time - last_activity <= idle_timeout:
+            break
+        heapq.heappop(_idle_heap)
+
+        info = server_registry.get(session_id)
+        if info is None:
+            continue  # session already gone
+        if info.get('_last_activity_mono', 0) != last_activity:
+            continue  # stale entry; a fresher one is still in the heap
 
-    for session_id, info in server_registry.items():
-        last_activity = info.get('last_activity', info.get('created_at', 0))
         idle_time = current_time - last_activity
-        if idle_time > idle_timeout:
-            idle_sessions.append(session_id)
-            logger.info(f"Session {session_id} idle for {idle_time:.0f}s, shutting down")
-
-    for session_id in idle_sessions:
+        logger.info(f"Session {session_id} idle for {idle_time:.0f}s, shutting down")
         shutdown_server(session_id, termination_reason="idle_timeout")
+        cleaned += 1
 
-    return len(idle_sessions)
+    return cleaned
 
 
 def shutdown_all_sessions():
@@ -302,13 +452,11 @@ def shutdown_all_sessions():
 def get_port_status() -> dict:
     """Get port pool status."""
     total_ports = len(available_ports) + len(reserved_ports)
-    port_min = config.port_pool.start
-    port_max = config.port_pool.end - 1
 
     return {
         'total_ports': total_ports,
         'reserved_ports': len(reserved_ports),
         'available_ports': len(available_ports),
         'reserved_port_list': sorted(list(reserved_ports)),
-        'port_range': f"{port_min}-{port_max}"
+        'port_range': f"{_port_min}-{_port_max}"
     }
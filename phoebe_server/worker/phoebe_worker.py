@@ -1,6 +1,13 @@
 """PHOEBE worker process."""
 
 import sys
+import copy
+import functools
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from collections import OrderedDict
 from typing import Any
 import zmq
 import phoebe
@@ -8,48 +15,183 @@ import json
 import traceback
 import numpy as np
 from phoebe import u
+from phoebe.parameters import (
+    ChoiceParameter,
+    IntParameter,
+    FloatParameter,
+    BoolParameter,
+    StringParameter,
+)
+
+from . import wire
+from .proxy import worker_endpoint
+
+# PHOEBE only filters on registered contexts; register our custom 'ui'
+# context once per process. The guard keeps repeated imports or in-process
+# worker re-instantiation (tests) from growing the list.
+if 'ui' not in phoebe.parameters.parameters._contexts:
+    phoebe.parameters.parameters._contexts.append('ui')
+
+# Parameter classes constructible through attach_parameters, keyed by the
+# 'ptype' field of each request entry
+_PTYPE_CLASS = {
+    'choice': ChoiceParameter,
+    'int': IntParameter,
+    'float': FloatParameter,
+    'bool': BoolParameter,
+    'string': StringParameter,
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _template_bundle():
+    """Default bundle with the server's standard constraint flips and
+    solver. Built once per process; instantiations deep-copy it, which is
+    much cheaper than re-running the constraint-graph setup."""
+    # TODO: move to the client and add SDK/API support!
+    bundle = phoebe.default_binary()
+    bundle.flip_constraint('mass@primary', solve_for='q@binary')
+    bundle.flip_constraint('mass@secondary', solve_for='sma@binary')
+    bundle.add_solver('differential_corrections', solver='dc')
+    return bundle
+
+
+def wire_default(obj):
+    """Encode astropy units/quantities for msgpack; numpy is handled by
+    msgpack-numpy and everything else is native."""
+    if isinstance(obj, (u.Unit, u.IrreducibleUnit, u.CompositeUnit)):
+        return str(obj)
+    if isinstance(obj, u.Quantity):
+        return {'value': obj.value, 'unit': str(obj.unit)}
+    raise TypeError(f"Object of type {type(obj).__name__} is not wire-serializable")
 
 
-def make_json_serializable(obj):
-    """Convert numpy arrays to JSON-compatible types."""
-    # if isinstance(obj, np.ndarray):
-    #     return obj.tolist()
+def _serialize_dict(obj):
+    return {k: make_json_serializable(v) for k, v in obj.items()}
+
+
+def _serialize_list(obj):
+    return [make_json_serializable(item) for item in obj]
+
+
+def _identity(obj):
+    return obj
+
+
+def _serialize_other(obj):
+    """Slow path for exotic types the dispatch table misses (subclasses,
+    astropy units/quantities)."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
     if isinstance(obj, np.integer):
         return int(obj)
-    elif isinstance(obj, np.floating):
+    if isinstance(obj, np.floating):
         return float(obj)
-    elif isinstance(obj, np.bool_):
+    if isinstance(obj, np.bool_):
         return bool(obj)
-    elif isinstance(obj, (u.Unit, u.IrreducibleUnit, u.CompositeUnit)):
+    if isinstance(obj, (u.Unit, u.IrreducibleUnit, u.CompositeUnit)):
         return str(obj)
-    elif isinstance(obj, u.Quantity):
+    if isinstance(obj, u.Quantity):
         return {
             'value': make_json_serializable(obj.value),
             'unit': make_json_serializable(obj.unit)
         }
-    elif isinstance(obj, dict):
-        return {k: make_json_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, (list, tuple, np.ndarray)):
-        return [make_json_serializable(item) for item in obj]
-
+    if isinstance(obj, dict):
+        return _serialize_dict(obj)
+    if isinstance(obj, (list, tuple)):
+        return _serialize_list(obj)
     return obj
 
 
+# Exact-type dispatch: bundle JSON is mostly str/int/float leaves, and a
+# dict lookup on type(obj) beats walking an isinstance chain per leaf.
+# tolist() converts a whole array in C instead of recursing into it one
+# boxed element at a time.
+_SERIALIZERS = {
+    np.ndarray: lambda a: a.tolist(),
+    np.int32: int,
+    np.int64: int,
+    np.float32: float,
+    np.float64: float,
+    np.bool_: bool,
+    dict: _serialize_dict,
+    list: _serialize_list,
+    tuple: _serialize_list,
+    str: _identity,
+    int: _identity,
+    float: _identity,
+    bool: _identity,
+    type(None): _identity,
+}
+
+
+def make_json_serializable(obj):
+    """Convert numpy arrays to JSON-compatible types."""
+    fn = _SERIALIZERS.get(type(obj))
+    if fn is not None:
+        return fn(obj)
+    return _serialize_other(obj)
+
+
+def assemble_model_frames(header: dict, arrays: list) -> dict:
+    """Rebuild the run_compute result dict from a frame header and the
+    array list it indexes (fallback path when frames can't go raw)."""
+    model = {}
+    for dataset, entries in header.items():
+        model[dataset] = {name: arrays[spec['frame']] for name, spec in entries.items()}
+    return {'model': model}
+
+
 class PhoebeWorker:
     """PHOEBE computation worker."""
 
+    # Commands dispatched to the compute thread so the main loop stays
+    # responsive (a REP socket would block every ping behind them)
+    HEAVY_COMMANDS = frozenset({'run_compute', 'run_solver'})
+
+    # Commands that never touch the bundle and can run without the lock
+    # even while a compute is in flight
+    LOCK_FREE_COMMANDS = frozenset({'ping'})
+
     def __init__(self, port: int):
         self.port = port
         self.context = zmq.Context()
-        self.socket = self.context.socket(zmq.REP)
-        self.socket.bind(f"tcp://127.0.0.1:{port}")
-
-        # TODO: move to the client and add SDK/API support!
-        self.bundle = phoebe.default_binary()
-        self.bundle.flip_constraint('mass@primary', solve_for='q@binary')
-        self.bundle.flip_constraint('mass@secondary', solve_for='sma@binary')
-        self.bundle.add_solver('differential_corrections', solver='dc')
-        phoebe.parameters.parameters._contexts.append('ui')
+        # ROUTER keeps the REQ envelope per request, so replies can be
+        # sent out of order while a long compute is still running
+        self.socket = self.context.socket(zmq.ROUTER)
+        endpoint = worker_endpoint(port)
+        if endpoint.startswith("ipc://"):
+            # ZMQ won't bind over a stale socket file from a crashed worker
+            Path(endpoint[len("ipc://"):]).unlink(missing_ok=True)
+        self.socket.bind(endpoint)
+
+        # Replies computed off the main thread come back over inproc;
+        # ZMQ sockets must not be shared across threads
+        self._replies = self.context.socket(zmq.PULL)
+        self._replies.bind('inproc://replies')
+        self._tls = threading.local()
+
+        # Single compute thread: bundle operations are serialized through
+        # _bundle_lock, the pool only moves them off the main loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='compute')
+        self._bundle_lock = threading.RLock()
+
+        self.bundle = copy.deepcopy(_template_bundle())
+
+        # Twig filtering scans the whole bundle, and the UI re-requests the
+        # same parameters constantly; memoize lookups until a command
+        # mutates the bundle.
+        self._param_cache: dict[tuple, Any] = {}
+
+        # Model results keyed on a hash of the full post-run bundle state
+        # plus the run_compute kwargs: a hit means the bundle already
+        # carries exactly the cached model, so identical re-runs during UI
+        # exploration skip the evaluation without leaving bundle reads
+        # (get_bundle, get_value on the model context) stale. Bounded LRU
+        # since the cached (header, arrays) pairs carry full light/RV
+        # curves.
+        self._compute_cache: OrderedDict[str, tuple] = OrderedDict()
+        self._compute_cache_size = 16
 
         self.commands = {
             'ping': self.ping,
@@ -70,67 +212,168 @@ class PhoebeWorker:
             'attach_parameters': self.attach_parameters,
         }
 
+        # ping dominates call counts (health probes, UI keepalive) and its
+        # response is a constant; pack it once
+        self._ping_reply = wire.pack({'success': True, 'result': self.ping()})
+
         print(f"[phoebe_worker] Running on port {port}")
 
     def run(self):
         """Main worker loop."""
+        # Hoist attribute lookups out of the loop; these are hit on every
+        # message and UI polling keeps the message rate high
+        frontend = self.socket
+        replies = self._replies
+        commands = self.commands
+
+        poller = zmq.Poller()
+        poller.register(frontend, zmq.POLLIN)
+        poller.register(replies, zmq.POLLIN)
+
         while True:
-            args = self.socket.recv_json()
-            if type(args) is not dict:
-                raise ValueError(f'API returned a non-dictionary value: {args}')
+            events = dict(poller.poll())
+
+            # Forward finished compute replies back out the ROUTER
+            if replies in events:
+                frontend.send_multipart(replies.recv_multipart(), copy=False)
+
+            if frontend not in events:
+                continue
 
-            command = args.pop('command')
-            if command not in self.commands:
+            frames = frontend.recv_multipart()
+            envelope, payload = frames[:-1], frames[-1]
+            message = wire.unpack(payload)
+            if type(message) is not list or len(message) != 2:
+                raise ValueError(f'API sent a malformed message: {message}')
+
+            command, args = message
+            if command == 'ping':
+                # constant reply; skip dispatch, locking and re-packing
+                frontend.send_multipart([*envelope, self._ping_reply], copy=False)
+                continue
+            if command not in commands:
                 response = {
                     'success': False,
                     'error': f'API does not recognize command {command}.'
                 }
-                self.socket.send_json(response)
+                frontend.send_multipart([*envelope, wire.pack(response)])
                 continue
 
-            try:
+            if command in self.HEAVY_COMMANDS:
+                self._executor.submit(self._execute_and_reply, envelope, command, args)
+            elif command in self.LOCK_FREE_COMMANDS:
+                self._execute_and_reply(envelope, command, args)
+            elif self._bundle_lock.acquire(blocking=False):
+                # Uncontended: run inline (the RLock re-enters in
+                # _execute_and_reply)
+                try:
+                    self._execute_and_reply(envelope, command, args)
+                finally:
+                    self._bundle_lock.release()
+            else:
+                # A compute holds the bundle; queue the command behind it
+                # on the executor instead of parking the loop on the lock,
+                # so pings keep being answered for the whole run
+                self._executor.submit(self._execute_and_reply, envelope, command, args)
+
+    def _execute_and_reply(self, envelope: list, command: str, args: dict):
+        """Run a command and send its reply (directly from the main loop,
+        or via the inproc relay when on the compute thread)."""
+        try:
+            if command in self.LOCK_FREE_COMMANDS:
                 result = self.commands[command](**args)
-                response = {
-                    'success': True,
-                    'result': make_json_serializable(result)
-                }
-
-                self.socket.send_json(response)
+            else:
+                with self._bundle_lock:
+                    result = self.commands[command](**args)
+            if isinstance(result, tuple):
+                # (header, arrays): model arrays ride as raw binary frames
+                # after the header instead of per-element encoded payloads
+                header, arrays = result
+                if wire.HAVE_MSGPACK:
+                    payload = wire.pack({'success': True, 'frames': header},
+                                        default=wire_default)
+                    self._send([*envelope, payload,
+                                *(memoryview(a) for a in arrays)])
+                    return
+                result = assemble_model_frames(header, arrays)
+            if not wire.NATIVE_NUMPY:
+                # stdlib-json fallback can't carry numpy types natively
+                result = make_json_serializable(result)
+            response = {
+                'success': True,
+                'result': result
+            }
+            payload = wire.pack(response, default=wire_default)
 
-            except Exception as e:
-                error_response = {
-                    'success': False,
-                    'error': str(e),
-                    'traceback': traceback.format_exc()
-                }
-                self.socket.send_json(error_response)
+        except Exception as e:
+            payload = wire.pack({
+                'success': False,
+                'error': str(e),
+                'traceback': traceback.format_exc()
+            })
+
+        self._send([*envelope, payload])
+
+    def _send(self, frames: list):
+        """Send reply frames out the ROUTER (via the inproc relay when
+        called off the main thread)."""
+        if threading.current_thread() is threading.main_thread():
+            # copy=False hands the buffers to ZMQ without an extra copy;
+            # large model payloads go out zero-copy
+            self.socket.send_multipart(frames, copy=False)
+        else:
+            self._reply_socket().send_multipart(frames, copy=False)
+
+    def _reply_socket(self):
+        """Per-thread PUSH socket feeding replies back to the main loop."""
+        sock = getattr(self._tls, 'push', None)
+        if sock is None:
+            sock = self.context.socket(zmq.PUSH)
+            sock.connect('inproc://replies')
+            self._tls.push = sock
+        return sock
 
     def ping(self):
         """Health check / readiness probe."""
         return {'status': 'ready'}
 
+    def _cached_parameter(self, **kwargs):
+        """Look up a Parameter, memoized on the filter kwargs."""
+        try:
+            key = tuple(sorted(kwargs.items()))
+            par = self._param_cache.get(key)
+        except TypeError:
+            # unhashable filter value (e.g. a list of twigs); skip the cache
+            return self.bundle.get_parameter(**kwargs)
+        if par is None:
+            par = self.bundle.get_parameter(**kwargs)
+            self._param_cache[key] = par
+        return par
+
     def get_parameter(self, **kwargs):
-        par = self.bundle.get_parameter(**kwargs)
+        par = self._cached_parameter(**kwargs)
         par_dict = par.to_dict()
         par_dict['Class'] = par.__class__.__name__
         return par_dict
 
     def get_value(self, **kwargs):
-        try:
-            value = self.bundle.get_value(**kwargs)
-            return value
-        except Exception:
-            raise
+        # Plain twig lookups resolve through the parameter cache; anything
+        # with value-conversion kwargs goes through the bundle untouched.
+        if not ({'unit', 'default', 't'} & kwargs.keys()):
+            return self._cached_parameter(**kwargs).get_value()
+        return self.bundle.get_value(**kwargs)
 
     def set_value(self, value, **kwargs):
         try:
             self.bundle.set_value(value=value, **kwargs)
+            self._param_cache.clear()
             return {}
         except Exception:
             raise
 
     def add_dataset(self, **kwargs):
         self.bundle.add_dataset(**kwargs)
+        self._param_cache.clear()
         return {}
 
     def remove_dataset(self, dataset, **kwargs):
@@ -141,23 +384,65 @@ class PhoebeWorker:
         for ui_param in self.bundle.filter(dataset=dataset, context='ui'):
             self.bundle.remove_parameter(ui_param)
 
+        self._param_cache.clear()
         return {}
 
+    def _compute_key(self, kwargs: dict) -> str:
+        """Content hash of the bundle state and run_compute kwargs."""
+        state = json.dumps(self.bundle.to_json(incl_uniqueid=False), sort_keys=True)
+        return hashlib.blake2b(
+            state.encode() + repr(sorted(kwargs.items())).encode()
+        ).hexdigest()
+
     def run_compute(self, **kwargs):
-        self.bundle.run_compute(**kwargs)
+        try:
+            cache_key = self._compute_key(kwargs)
+        except TypeError:
+            cache_key = None
 
-        model = {}
+        if cache_key is not None and cache_key in self._compute_cache:
+            # Entries are keyed on the post-run state, so a hit means the
+            # bundle's model context already matches the cached arrays and
+            # the run can be skipped without leaving the bundle stale
+            self._compute_cache.move_to_end(cache_key)
+            return self._compute_cache[cache_key]
+
+        self.bundle.run_compute(**kwargs)
+        # running a compute re-attaches the model context, so any cached
+        # model-context Parameter objects are now stale
+        self._param_cache.clear()
+
+        # Arrays are returned as raw binary frames alongside a header that
+        # maps dataset/qualifier to a frame index; the reply path forwards
+        # the buffers without per-element encoding.
+        header = {}
+        arrays = []
+
+        def add(dataset, name, value):
+            arr = np.ascontiguousarray(value)
+            header[dataset][name] = {
+                'frame': len(arrays),
+                'shape': list(arr.shape),
+                'dtype': str(arr.dtype),
+            }
+            arrays.append(arr)
+
+        # Filter down to the model and dataset contexts once; the
+        # per-dataset lookups below then search those small sets instead
+        # of re-filtering the whole bundle 3-5 times per dataset.
+        model_ps = self.bundle.filter(context='model')
+        dataset_ps = self.bundle.filter(context='dataset')
 
         # We now need to traverse all datasets and assign the results accordingly:
         for dataset in self.bundle.datasets:
-            kind = self.bundle[f'{dataset}@dataset'].kind  # 'lc' or 'rv'
+            kind = dataset_ps.filter(dataset=dataset).kind  # 'lc' or 'rv'
 
-            model[dataset] = {}
-            model[dataset]['times'] = self.bundle.get_value('compute_times', dataset=dataset, context='dataset')
-            model[dataset]['phases'] = self.bundle.get_value('compute_phases', dataset=dataset, context='dataset')
+            header[dataset] = {}
+            add(dataset, 'times', dataset_ps.get_value(qualifier='compute_times', dataset=dataset))
+            add(dataset, 'phases', dataset_ps.get_value(qualifier='compute_phases', dataset=dataset))
 
             if kind == 'lc':
-                model[dataset]['fluxes'] = self.bundle.get_value('fluxes', dataset=dataset, context='model')
+                fluxes = model_ps.get_value(qualifier='fluxes', dataset=dataset)
 
                 # Structure of the returned model depends on whether solution is
                 # passed in kwargs or not. Without solution (default), run_compute
@@ -167,20 +452,33 @@ class PhoebeWorker:
                 # of the resulting 2D array.
 
                 if 'solution' in kwargs:
-                    model[dataset]['fluxes'] = model[dataset]['fluxes'][0]  # take the first sample
+                    fluxes = fluxes[0]  # take the first sample
+                add(dataset, 'fluxes', fluxes)
             if kind == 'rv':
-                model[dataset]['rv1s'] = self.bundle.get_value('rvs', dataset=dataset, component='primary', context='model')
-                model[dataset]['rv2s'] = self.bundle.get_value('rvs', dataset=dataset, component='secondary', context='model')
+                rv1s = model_ps.get_value(qualifier='rvs', dataset=dataset, component='primary')
+                rv2s = model_ps.get_value(qualifier='rvs', dataset=dataset, component='secondary')
                 if 'solution' in kwargs:
-                    model[dataset]['rv1s'] = model[dataset]['rv1s'][0]  # take the first sample
-                    model[dataset]['rv2s'] = model[dataset]['rv2s'][0]  # take the first sample
+                    rv1s = rv1s[0]  # take the first sample
+                    rv2s = rv2s[0]  # take the first sample
+                add(dataset, 'rv1s', rv1s)
+                add(dataset, 'rv2s', rv2s)
 
-        return {
-            'model': model
-        }
+        result = (header, arrays)
+
+        if cache_key is not None:
+            # Re-hash now that the run attached its model context; storing
+            # under the post-run key is what makes a later hit safe to
+            # serve without touching the bundle
+            self._compute_cache[self._compute_key(kwargs)] = result
+            if len(self._compute_cache) > self._compute_cache_size:
+                self._compute_cache.popitem(last=False)
+
+        return result
 
     def run_solver(self, **kwargs):
         self.bundle.run_solver(**kwargs)
+        # the solver attaches a solution context; drop cached parameters
+        self._param_cache.clear()
 
         fit_parameters = self.bundle.get_value('fitted_twigs', context='solution')
         init_values = self.bundle.get_value('initial_values', context='solution')
@@ -193,14 +491,20 @@ class PhoebeWorker:
         }}
 
     def get_bundle(self, **kwargs):
-        return {'bundle': json.dumps(self.bundle.to_json(incl_uniqueid=True))}
+        # Return the bundle dict as-is; the wire encoder serializes it in
+        # one pass instead of embedding a pre-dumped (and re-escaped) string
+        return {'bundle': self.bundle.to_json(incl_uniqueid=True)}
 
     def load_bundle(self, bundle, **kwargs):
-        self.bundle = phoebe.load(json.loads(bundle, object_pairs_hook=phoebe.utils.parse_json))  # type: ignore
+        if isinstance(bundle, str):
+            # older clients send the bundle as a JSON string
+            bundle = json.loads(bundle, object_pairs_hook=phoebe.utils.parse_json)
+        self.bundle = phoebe.load(bundle)  # type: ignore
+        self._param_cache.clear()
         return {}
 
     def save_bundle(self, **kwargs):
-        return {'bundle': json.dumps(self.bundle.to_json(incl_uniqueid=True))}
+        return {'bundle': self.bundle.to_json(incl_uniqueid=True)}
 
     def get_datasets(self, **kwargs):
         datasets = {}
@@ -209,10 +513,10 @@ class PhoebeWorker:
         return {'datasets': datasets}
 
     def get_uniqueid(self, twig, **kwargs):
-        return self.bundle.get_parameter(twig).uniqueid
+        return self._cached_parameter(twig=twig).uniqueid
 
     def is_parameter_constrained(self, twig=None, uniqueid=None, **kwargs):
-        par = self.bundle.get_parameter(twig=twig, uniqueid=uniqueid)
+        par = self._cached_parameter(twig=twig, uniqueid=uniqueid)
         return bool(par.constrained_by)
 
     def attach_parameters(self, parameters: list[dict[str, Any]]):
@@ -247,30 +551,22 @@ class PhoebeWorker:
         self.bundle._attach_params(parameters)
         ```
         """
-        from phoebe.parameters import ChoiceParameter, IntParameter, FloatParameter, BoolParameter, StringParameter
-
-        ptype_class = {
-            'choice': ChoiceParameter,
-            'int': IntParameter,
-            'float': FloatParameter,
-            'bool': BoolParameter,
-            'string': StringParameter,
-        }
-
         params = []
         for parameter in parameters:
             ptype = parameter.pop('ptype')
-            if ptype not in ptype_class:
+            if ptype not in _PTYPE_CLASS:
                 raise ValueError(f"Unsupported parameter type: {ptype}")
 
-            params.append(ptype_class[ptype](**parameter))
+            params.append(_PTYPE_CLASS[ptype](**parameter))
 
-        try:
-            self.bundle._attach_params(params)
-        except Exception as e:
-            print(f"Error attaching parameters: {e}")
+        # Let failures propagate to the reply path; swallowing them here
+        # left the caller unable to detect a partial attach
+        self.bundle._attach_params(params)
+        self._param_cache.clear()
 
-        unique_ids = [par['uniqueid'] for par in params]
+        # Direct attribute access; par['uniqueid'] goes through Parameter's
+        # filtering __getitem__, which is a full filter per parameter
+        unique_ids = [par.uniqueid for par in params]
 
         return {'unique_ids': unique_ids}
 
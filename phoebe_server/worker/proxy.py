@@ -1,14 +1,60 @@
 """ZMQ command proxy."""
 
+import sys
 import zmq
+import numpy as np
+
+from . import wire
+
+
+def _to_jsonable(obj):
+    """Convert numpy containers decoded from the wire into JSON-compatible
+    builtins for the HTTP response."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, dict):
+        return {k: _to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_jsonable(item) for item in obj]
+    return obj
+
+
+def worker_endpoint(port: int) -> str:
+    """ZMQ endpoint for the worker identified by `port`.
+
+    Unix domain sockets skip the loopback TCP/IP stack entirely; the port
+    number is kept as the session identity and embedded in the socket path.
+    Windows has no ipc:// transport, so fall back to loopback TCP there.
+    """
+    if sys.platform == "win32":
+        return f"tcp://127.0.0.1:{port}"
+    return f"ipc:///tmp/phoebe-{port}.sock"
 
 
 def send_command(port: int, command: dict) -> dict:
     """Send a command to a PHOEBE worker via ZMQ."""
-    ctx = zmq.Context()
-    socket = ctx.socket(zmq.REQ)
-    socket.connect(f"tcp://localhost:{port}")
-    socket.send_json(command)
-    reply = socket.recv_json()
+    # Context creation spins up IO threads; share the process-wide one
+    socket = zmq.Context.instance().socket(zmq.REQ)
+    socket.connect(worker_endpoint(port))
+    # Wire protocol is a [command, kwargs] pair, so the worker unpacks
+    # straight into dispatch without popping a magic key out of the dict
+    args = dict(command)
+    socket.send(wire.pack([args.pop('command'), args]))
+    frames = socket.recv_multipart()
     socket.close()
-    return reply
+
+    reply = wire.unpack(frames[0])
+    if len(frames) > 1:
+        # Model arrays arrive as raw binary frames after the header;
+        # rebuild them in one frombuffer call each, no per-element work
+        model = {}
+        for dataset, entries in reply.pop('frames').items():
+            model[dataset] = {
+                name: np.frombuffer(frames[1 + spec['frame']],
+                                    dtype=spec['dtype']).reshape(spec['shape'])
+                for name, spec in entries.items()
+            }
+        reply['result'] = {'model': model}
+    return _to_jsonable(reply)
@@ -0,0 +1,64 @@
+"""Wire format for server<->worker ZMQ messages.
+
+msgpack carries numpy arrays as length-prefixed binary blobs (via
+msgpack-numpy), so model results never go through a Python-level
+per-element walk. If msgpack is not installed both ends fall back to
+JSON, which is what the protocol originally used; orjson accelerates
+that fallback (C encoder with native numpy support) when present,
+stdlib json is the last resort.
+"""
+
+import json
+import threading
+
+try:
+    import msgpack
+    import msgpack_numpy
+    msgpack_numpy.patch()
+except ImportError:
+    msgpack = None
+
+# Packer/Unpacker buffers amortize across messages, but the objects are
+# not thread-safe and both ends encode/decode from several threads
+# (worker main loop + compute thread, FastAPI worker threads), so keep
+# one per thread.
+_tls = threading.local()
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+HAVE_MSGPACK = msgpack is not None
+
+# True when the encoder accepts numpy scalars/arrays directly, so callers
+# can skip the recursive pure-Python conversion pass
+NATIVE_NUMPY = msgpack is not None or orjson is not None
+
+
+def pack(obj, default=None) -> bytes:
+    """Serialize a message; `default` handles types the encoder doesn't know."""
+    if msgpack is not None:
+        packers = getattr(_tls, 'packers', None)
+        if packers is None:
+            packers = _tls.packers = {}
+        packer = packers.get(default)
+        if packer is None:
+            packer = packers[default] = msgpack.Packer(use_bin_type=True, default=default)
+        return packer.pack(obj)
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj).encode()
+
+
+def unpack(data):
+    """Deserialize a message produced by pack()."""
+    if msgpack is not None:
+        unpacker = getattr(_tls, 'unpacker', None)
+        if unpacker is None:
+            unpacker = _tls.unpacker = msgpack.Unpacker(raw=False, max_buffer_size=256 * 1024 * 1024)
+        unpacker.feed(data)
+        return next(unpacker)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,35 @@
+"""Shared test fixtures."""
+
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+
+from phoebe_server import database
+from phoebe_server.config import config
+from phoebe_server.main import app
+from phoebe_server.manager import session_manager
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Create a test client with proper initialization.
+
+    App, database and port-pool setup (normally done in lifespan) is
+    shared across the whole run instead of repeated per module.
+    """
+    database.init_database()
+    session_manager.load_port_config()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def db_conn(client):
+    """One inspection connection per test module instead of a fresh
+    sqlite3.connect (file open, pragma negotiation, WAL probe) per
+    assertion block. Autocommit mode so every query sees the writer's
+    latest committed state.
+    """
+    conn = sqlite3.connect(config.database.path, isolation_level=None)
+    yield conn
+    conn.close()
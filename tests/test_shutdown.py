@@ -1,29 +1,41 @@
 """Test graceful shutdown of all sessions."""
 
-import pytest
-from fastapi.testclient import TestClient
-from phoebe_server.main import app
 from phoebe_server.manager import session_manager
 
 
-@pytest.fixture(scope="module")
-def client():
-    """Create a test client with proper initialization."""
-    # Initialize port pool and database (normally done in lifespan)
-    session_manager.load_port_config()
-    with TestClient(app) as test_client:
-        yield test_client
+class _FakeWorker:
+    """Stands in for a worker subprocess; shutdown only touches the
+    Popen surface, so no real PHOEBE boot is needed to test it."""
+
+    def __init__(self):
+        self.terminated = False
+
+    def poll(self):
+        return 0 if self.terminated else None
+
+    def terminate(self):
+        self.terminated = True
+
+    def kill(self):
+        self.terminated = True
+
+    def wait(self, timeout=None):
+        return 0
 
 
 def test_shutdown_all_sessions(client):
     """Test that shutdown_all_sessions terminates all active sessions."""
-    # Start multiple sessions
-    session_ids = []
-    for _ in range(3):
-        response = client.post("/dash/start-session")
-        assert response.status_code == 200
-        session_data = response.json()
-        session_ids.append(session_data["session_id"])
+    # Register fake sessions on real ports from the pool
+    session_manager.server_registry.clear()
+    workers = []
+    for i in range(3):
+        port = session_manager.request_port()
+        worker = _FakeWorker()
+        workers.append(worker)
+        session_manager.server_registry[f"fake-session-{i}"] = {
+            'process': worker,
+            'public': {'session_id': f"fake-session-{i}", 'port': port},
+        }
 
     # Verify they exist
     assert len(session_manager.server_registry) == 3
@@ -34,6 +46,7 @@ def test_shutdown_all_sessions(client):
     # Verify all were shutdown
     assert count == 3
     assert len(session_manager.server_registry) == 0
+    assert all(worker.terminated for worker in workers)
 
     # Verify ports were freed
     port_status = session_manager.get_port_status()